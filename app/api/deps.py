@@ -3,10 +3,9 @@
 from typing import Generator
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
 from sqlalchemy.orm import Session
 
-from app.core.config import settings
+from app.core.security import decode_access_token
 from app.core.database import get_db
 from app.models.user import User
 
@@ -27,13 +26,11 @@ def get_current_user(
     )
     try:
         # 解码 Token
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = decode_access_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
-    except JWTError:
+    except ValueError:
         raise credentials_exception
     
     # 查库获取用户
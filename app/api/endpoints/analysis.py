@@ -1,23 +1,73 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Response
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
 from app.core.models import AnalysisRequest, AnalysisResponse, ComparisonRequest, ComparisonResponse
-from app.services.llm_analyzer import llm_service
+from app.services.llm_analyzer import llm_service, ServiceDraining, SYSTEM_DIMENSION
+from app.services.near_duplicate import near_duplicate_index
+from app.services.usage import usage_tracker, QuotaExceeded
 from app.api import deps
 from app.models.user import User
 
 router = APIRouter()
 
+# 服务关闭期间建议客户端的重试间隔 (秒)
+RETRY_AFTER_SECONDS = 5
+
+def _service_draining() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Service is shutting down, please retry",
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+    )
+
+
 @router.post("/analyze", response_model=AnalysisResponse)
 async def analyze_code_endpoint(
     request: AnalysisRequest,
+    response: Response,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(deps.get_current_user) # 新增：必须登录才能调用
 ):
     """
     单代码质量检测接口 (需认证)
+    与历史提交近似重复时将其结果作为参考传给模型；开启 NEAR_DUP_REUSE_ENABLED 时
+    可直接复用历史结果 (响应头 X-Near-Duplicate-Of / X-Near-Duplicate-Similarity)
     """
     if not request.code_content.strip():
         raise HTTPException(status_code=400, detail="Code content cannot be empty")
-        
-    return await llm_service.analyze_code(request)
+    if llm_service.is_draining:
+        raise _service_draining()
+
+    fingerprints, match = [], None
+    if settings.NEAR_DUP_ENABLED:
+        fingerprints, match = await run_in_threadpool(near_duplicate_index.lookup, current_user.id, request)
+
+    if (
+        match is not None
+        and settings.NEAR_DUP_REUSE_ENABLED
+        and match.similarity >= settings.NEAR_DUP_REUSE_THRESHOLD
+    ):
+        # 仅在直接复用历史结果时设置，客户端据此区分复用结果与新分析结果
+        response.headers["X-Near-Duplicate-Of"] = str(match.entry_id)
+        response.headers["X-Near-Duplicate-Similarity"] = f"{match.similarity:.3f}"
+        return match.result
+
+    try:
+        async with usage_tracker.reserve(current_user.id):
+            result = await llm_service.analyze_code(
+                request,
+                user_id=current_user.id,
+                reference=match.result if match is not None else None
+            )
+    except QuotaExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except ServiceDraining:
+        raise _service_draining()
+
+    # 失败结果不入库；指纹写入放到响应返回之后执行
+    if settings.NEAR_DUP_ENABLED and not any(i.dimension == SYSTEM_DIMENSION for i in result.issues):
+        background_tasks.add_task(near_duplicate_index.store, current_user.id, request, fingerprints, result)
+    return result
 
 @router.post("/compare", response_model=ComparisonResponse)
 async def compare_codes_endpoint(
@@ -27,4 +77,13 @@ async def compare_codes_endpoint(
     """
     双代码对比接口 (需认证)
     """
-    return await llm_service.compare_codes(request)
\ No newline at end of file
+    if llm_service.is_draining:
+        raise _service_draining()
+
+    try:
+        async with usage_tracker.reserve(current_user.id):
+            return await llm_service.compare_codes(request, user_id=current_user.id)
+    except QuotaExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except ServiceDraining:
+        raise _service_draining()
\ No newline at end of file
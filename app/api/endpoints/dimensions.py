@@ -1,7 +1,8 @@
 from typing import List, Any
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from app.api import deps
+from app.api.etag import make_etag, is_not_modified, not_modified_response, etag_json_response
 from app.core.database import get_db
 from app.core import models
 from app.models.user import User, CustomDimension
@@ -10,11 +11,16 @@ router = APIRouter()
 
 @router.get("/", response_model=List[models.DimensionOut])
 def get_my_dimensions(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_current_user)
 ) -> Any:
-    """获取当前用户的所有自定义维度"""
-    return current_user.dimensions
+    """获取当前用户的所有自定义维度 (支持 If-None-Match，未变化时返回 304)"""
+    items = [models.DimensionOut.model_validate(d).model_dump() for d in current_user.dimensions]
+    etag = make_etag("dimensions", current_user.id, items)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    return etag_json_response(items, etag)
 
 @router.post("/", response_model=models.DimensionOut)
 def create_dimension(
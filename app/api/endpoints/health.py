@@ -1,7 +1,45 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.database import engine
+from app.services.llm_analyzer import llm_service
 
 router = APIRouter()
 
 @router.get("/health")
 async def health_check():
-    return {"status": "ok", "service": "SmartCodeCheck Backend"}
\ No newline at end of file
+    return {"status": "ok", "service": "SmartCodeCheck Backend"}
+
+def _check_database():
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+@router.get("/ready")
+async def readiness_check(response: Response):
+    """
+    就绪探针：检查数据库与上游 LLM 是否可用
+    与 /health (存活探针) 不同，任一依赖不可用时返回 503，负载均衡应暂停转发流量
+    """
+    checks = {}
+
+    try:
+        await run_in_threadpool(_check_database)
+        checks["database"] = "ok"
+    except Exception as e:
+        checks["database"] = f"error: {e}"
+
+    if settings.READINESS_CHECK_UPSTREAM:
+        try:
+            await llm_service.check_upstream(timeout=settings.READINESS_TIMEOUT)
+            checks["upstream"] = "ok"
+        except Exception as e:
+            checks["upstream"] = f"error: {e}"
+
+    if llm_service.is_draining:
+        checks["lifecycle"] = "draining"
+
+    ready = all(v == "ok" for v in checks.values())
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"status": "ready" if ready else "unavailable", "checks": checks}
\ No newline at end of file
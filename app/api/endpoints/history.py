@@ -1,8 +1,10 @@
+from datetime import datetime, timezone
 from typing import List, Any
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
 from app.api import deps
+from app.api.etag import make_etag, is_not_modified, not_modified_response, etag_json_response
 from app.core.database import get_db
 from app.core import models
 from app.models.user import User, AnalysisHistory
@@ -13,16 +15,33 @@ MAX_HISTORY_COUNT = 10
 
 @router.get("/", response_model=List[models.HistoryOut])
 def get_history(
+    request: Request,
     type: str = None, # 可选筛选 detection 或 comparison
     db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_current_user)
 ) -> Any:
-    """获取当前用户的历史记录，按时间倒序"""
+    """
+    获取当前用户的历史记录，按时间倒序
+    支持 If-None-Match：历史记录创建后不会被修改，ETag 由 (ID, 创建时间) 列表生成，
+    命中时只查询这两列，不加载体积较大的 data 字段，直接返回 304
+    (SQLite 会在删除最新记录后复用其 ID，因此不能只用 ID)
+    """
     query = db.query(AnalysisHistory).filter(AnalysisHistory.user_id == current_user.id)
     if type:
         query = query.filter(AnalysisHistory.type == type)
-    
-    return query.order_by(desc(AnalysisHistory.created_at)).all()
+    query = query.order_by(desc(AnalysisHistory.created_at), desc(AnalysisHistory.id))
+
+    if request.headers.get("if-none-match"):
+        keys = [(row.id, row.created_at) for row in query.with_entities(AnalysisHistory.id, AnalysisHistory.created_at)]
+        etag = make_etag("history", current_user.id, type, keys)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+
+    records = query.all()
+    etag = make_etag("history", current_user.id, type, [(r.id, r.created_at) for r in records])
+    return etag_json_response(
+        [models.HistoryOut.model_validate(r).model_dump() for r in records], etag
+    )
 
 @router.post("/", response_model=models.HistoryOut)
 def create_history(
@@ -54,7 +73,9 @@ def create_history(
     new_record = AnalysisHistory(
         user_id=current_user.id,
         type=history_in.type,
-        data=history_in.data
+        data=history_in.data,
+        # 显式写入微秒级时间 (数据库默认值仅精确到秒)，保证复用 ID 的新记录 ETag 也不同
+        created_at=datetime.now(timezone.utc)
     )
     db.add(new_record)
     db.commit()
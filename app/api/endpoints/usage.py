@@ -0,0 +1,77 @@
+from datetime import timedelta
+from typing import Any
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.api import deps
+from app.core.config import settings
+from app.core.database import get_db
+from app.core import models
+from app.models.user import User, LLMUsage
+from app.services.usage import usage_tracker, today_start
+
+router = APIRouter()
+
+@router.get("/", response_model=models.UsageOut)
+def get_my_usage(
+    days: int = Query(30, ge=1, le=365),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+) -> Any:
+    """获取当前用户最近 days 天的 LLM 用量 (按模型汇总) 及当日配额使用情况"""
+    today = today_start()
+    since = today - timedelta(days=days - 1)
+
+    rows = db.query(
+        LLMUsage.model,
+        func.sum(LLMUsage.requests),
+        func.sum(LLMUsage.prompt_tokens),
+        func.sum(LLMUsage.completion_tokens),
+        func.sum(LLMUsage.cost),
+    ).filter(
+        LLMUsage.user_id == current_user.id,
+        LLMUsage.created_at >= since
+    ).group_by(LLMUsage.model).all()
+
+    today_requests, today_tokens = db.query(
+        func.coalesce(func.sum(LLMUsage.requests), 0),
+        func.coalesce(func.sum(LLMUsage.prompt_tokens + LLMUsage.completion_tokens), 0),
+    ).filter(
+        LLMUsage.user_id == current_user.id,
+        LLMUsage.created_at >= today
+    ).one()
+
+    by_model = {
+        model: [req or 0, prompt or 0, completion or 0, cost or 0.0]
+        for model, req, prompt, completion, cost in rows
+    }
+    # 合并当前 worker 中尚未写库的用量
+    for model, values in usage_tracker.pending_for(current_user.id).items():
+        entry = by_model.setdefault(model, [0, 0, 0, 0.0])
+        for i, v in enumerate(values):
+            entry[i] += v
+        today_requests += values[0]
+        today_tokens += values[1] + values[2]
+
+    items = [
+        models.ModelUsageOut(
+            model=model,
+            requests=int(v[0]),
+            prompt_tokens=int(v[1]),
+            completion_tokens=int(v[2]),
+            cost=round(v[3], 6),
+        )
+        for model, v in sorted(by_model.items())
+    ]
+    return models.UsageOut(
+        days=days,
+        requests=sum(i.requests for i in items),
+        prompt_tokens=sum(i.prompt_tokens for i in items),
+        completion_tokens=sum(i.completion_tokens for i in items),
+        cost=round(sum(i.cost for i in items), 6),
+        by_model=items,
+        today_requests=int(today_requests),
+        today_tokens=int(today_tokens),
+        daily_request_limit=settings.USAGE_DAILY_REQUEST_LIMIT or None,
+        daily_token_limit=settings.USAGE_DAILY_TOKEN_LIMIT or None,
+    )
\ No newline at end of file
@@ -0,0 +1,32 @@
+# ETag / If-None-Match 条件请求辅助函数
+
+import hashlib
+from typing import Any
+import orjson
+from fastapi import Request, Response, status
+
+def make_etag(*parts: Any) -> str:
+    """根据内容生成弱 ETag (响应可能被压缩，故使用弱校验)"""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'W/"{digest}"'
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """判断请求头 If-None-Match 是否与当前 ETag 匹配 (弱比较)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    current = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == current for tag in header.split(","))
+
+def _cache_headers(etag: str) -> dict:
+    # private: 数据按用户隔离；no-cache: 每次使用前都需向服务端校验
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_cache_headers(etag))
+
+def etag_json_response(content: Any, etag: str) -> Response:
+    # 直接返回 Response 时 FastAPI 不再经过 response_model 序列化，这里用 orjson 生成 JSON
+    return Response(orjson.dumps(content), media_type="application/json", headers=_cache_headers(etag))
\ No newline at end of file
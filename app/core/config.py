@@ -1,6 +1,6 @@
 import os
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "SmartCodeCheck API"
@@ -20,6 +20,39 @@ class Settings(BaseSettings):
     LOCAL_LLM_API_KEY: str = "EMPTY"                     # 本地通常不需要 Key
     LOCAL_MODEL_NAME: str = "my-finetuned-model"         # 默认本地模型名称
     
+    # --- 服务运行配置 ---
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    WEB_CONCURRENCY: int = 1                 # 生产模式下的 worker 进程数
+    AUTO_CREATE_TABLES: bool = True          # 启动时自动建表；多进程部署时由启动器统一执行并关闭
+    SHUTDOWN_DRAIN_TIMEOUT: float = 30.0     # 关闭时等待进行中请求完成的最长秒数 (uvicorn timeout_graceful_shutdown)
+    SHUTDOWN_READINESS_DELAY: float = 0.0    # 收到退出信号后继续监听、就绪探针返回 503 的秒数，供负载均衡摘除实例
+    READINESS_CHECK_UPSTREAM: bool = True    # 就绪探针是否检查云端 LLM 可达性
+    READINESS_TIMEOUT: float = 3.0           # 就绪探针中上游检查的超时秒数
+
+    # --- LLM 用量统计与配额 ---
+    USAGE_FLUSH_INTERVAL: float = 5.0        # 用量记录批量写库的间隔秒数
+    USAGE_DAILY_REQUEST_LIMIT: int = 0       # 每用户每日请求上限 (UTC 日)，0 表示不限制
+    USAGE_DAILY_TOKEN_LIMIT: int = 0         # 每用户每日 token 上限 (UTC 日)，0 表示不限制
+    LLM_MAX_CONCURRENCY: int = 0             # 每个 worker 对共享上游的最大并发调用数，超出后按用户公平排队；0 表示不限制
+    # 模型单价: {"模型名": [每千输入 token 价格, 每千输出 token 价格]}，未配置的模型费用记为 0
+    MODEL_PRICING: Dict[str, List[float]] = {}
+
+    # --- 响应压缩 ---
+    COMPRESSION_MINIMUM_SIZE: int = 1024     # 小于该字节数的响应不压缩
+    COMPRESSION_LEVEL: int = 6               # gzip 压缩级别 (1-9)
+    BROTLI_QUALITY: int = 4                  # brotli 压缩质量 (0-11)，需安装 brotli-asgi
+
+    # --- 近似重复代码检测 ---
+    NEAR_DUP_ENABLED: bool = True
+    # 直接复用历史结果 (不调用 LLM)；归一化会忽略局部变量名，默认关闭，仅把相似结果作为参考传给模型
+    NEAR_DUP_REUSE_ENABLED: bool = False
+    NEAR_DUP_REUSE_THRESHOLD: float = 0.9    # 开启复用时，相似度不低于该值直接返回历史结果
+    NEAR_DUP_SEED_THRESHOLD: float = 0.7     # 相似度不低于该值时把历史结果作为参考传给 LLM；大于 1 表示关闭
+    NEAR_DUP_SHARED: bool = False            # 是否在不同用户之间复用分析结果
+    NEAR_DUP_MAX_ENTRIES: int = 200          # 每个用户保留 (及检索) 的最近指纹数量
+    NEAR_DUP_MAX_CODE_LENGTH: int = 200_000  # 超过该字符数的代码不做近似重复检测
+
     # CORS 配置 (解析 JSON 字符串为列表)
     # 默认允许常见的本地开发端口，如果需要可通过环境变量覆盖
     CORS_ORIGINS: List[str] = [
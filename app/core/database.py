@@ -7,7 +7,8 @@ connect_args = {"check_same_thread": False} if "sqlite" in settings.DATABASE_URL
 
 engine = create_engine(
     settings.DATABASE_URL, 
-    connect_args=connect_args
+    connect_args=connect_args,
+    pool_pre_ping=True  # 连接池取出连接前先探活，避免数据库重启后拿到失效连接
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -20,4 +21,13 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def init_db():
+    """
+    创建所有数据表 (Simple Migration)
+    多 worker 部署时应只在启动器中执行一次，而不是在每个进程导入时执行
+    """
+    # 导入模型以确保其注册到 Base.metadata
+    import app.models  # noqa: F401
+    Base.metadata.create_all(bind=engine)
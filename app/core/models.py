@@ -94,4 +94,24 @@ class HistoryOut(BaseModel):
     created_at: Any
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# --- LLM 用量 Schema ---
+class ModelUsageOut(BaseModel):
+    model: str
+    requests: int
+    prompt_tokens: int
+    completion_tokens: int
+    cost: float
+
+class UsageOut(BaseModel):
+    days: int = Field(..., description="统计周期 (天)")
+    requests: int
+    prompt_tokens: int
+    completion_tokens: int
+    cost: float = Field(..., description="估算费用 (按 MODEL_PRICING 计算)")
+    by_model: List[ModelUsageOut]
+    today_requests: int
+    today_tokens: int
+    daily_request_limit: Optional[int] = Field(None, description="每日请求上限，为空表示不限制")
+    daily_token_limit: Optional[int] = Field(None, description="每日 token 上限，为空表示不限制")
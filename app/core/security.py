@@ -1,22 +1,28 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Any, Union
-from jose import jwt
-from passlib.context import CryptContext
 from app.core.config import settings
 
-# 配置密码哈希上下文，使用 bcrypt 算法
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# passlib / bcrypt 与 jose (cryptography) 导入较慢，推迟到首次使用时加载，缩短冷启动时间
+
+@lru_cache(maxsize=1)
+def get_pwd_context():
+    """配置密码哈希上下文，使用 bcrypt 算法"""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """验证明文密码是否与哈希匹配"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """生成密码哈希"""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
     """生成 JWT Access Token"""
+    from jose import jwt
+
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -25,4 +31,13 @@ def create_access_token(subject: Union[str, Any], expires_delta: timedelta = Non
     # payload 中 sub (subject) 通常存放唯一标识，这里存 username
     to_encode = {"exp": expire, "sub": str(subject)}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
+
+def decode_access_token(token: str) -> dict:
+    """解码并校验 JWT Access Token，无效时抛出 ValueError"""
+    from jose import jwt, JWTError
+
+    try:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError as e:
+        raise ValueError(str(e))
\ No newline at end of file
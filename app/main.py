@@ -1,20 +1,83 @@
+import asyncio
+import signal
+import threading
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from app.core.config import settings
-from app.api.endpoints import analysis, health, auth
-from app.core.database import Base, engine
-from app.api.endpoints import analysis, health, auth, dimensions, history
+from app.core.database import engine, init_db
+from app.services.llm_analyzer import llm_service
+from app.services.usage import usage_tracker
+from app.api.endpoints import analysis, health, auth, dimensions, history, usage
 
-# 自动创建数据库表 (Simple Migration)
-Base.metadata.create_all(bind=engine)
+def _drain_on_signal():
+    """
+    在 uvicorn 的退出信号处理函数之前进入排空状态
+    uvicorn 收到信号后会先关闭监听端口、等待进行中的请求，最后才执行 lifespan 关闭，
+    因此排空必须在信号到达时开始：就绪探针与新的分析请求返回 503，
+    SHUTDOWN_READINESS_DELAY 秒后再交给 uvicorn 关闭，期间负载均衡可摘除该实例
+    """
+    # 信号处理函数只能在主线程注册 (TestClient 等在子线程中运行 lifespan)
+    if threading.current_thread() is not threading.main_thread():
+        return
+    loop = asyncio.get_running_loop()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(sig)
+        if not callable(previous):
+            continue
+
+        def handler(signum, frame, previous=previous):
+            if llm_service.is_draining:
+                # 排空期间再次收到信号 (如连按两次 Ctrl+C) 立即交给 uvicorn
+                previous(signum, frame)
+                return
+            llm_service.begin_drain()
+            loop.call_soon_threadsafe(
+                loop.call_later, settings.SHUTDOWN_READINESS_DELAY, previous, signum, frame
+            )
+
+        signal.signal(sig, handler)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 启动：建表 (单进程/开发模式) 并创建 LLM 客户端
+    if settings.AUTO_CREATE_TABLES:
+        init_db()
+    await llm_service.startup()
+    await usage_tracker.startup()
+    _drain_on_signal()
+    yield
+    # 关闭：此时 uvicorn 已等待进行中的请求完成，释放客户端与数据库连接池
+    await llm_service.shutdown()
+    await usage_tracker.shutdown()  # 写入剩余的用量记录
+    engine.dispose()
 
 def create_app() -> FastAPI:
     app = FastAPI(
         title=settings.PROJECT_NAME,
         version=settings.VERSION,
-        description="Backend for SmartCodeCheck"
+        description="Backend for SmartCodeCheck",
+        lifespan=lifespan
     )
 
+    # 响应压缩 - 安装 brotli-asgi 时优先使用 brotli，否则使用 gzip
+    try:
+        from brotli_asgi import BrotliMiddleware
+        app.add_middleware(
+            BrotliMiddleware,
+            quality=settings.BROTLI_QUALITY,
+            minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+            gzip_fallback=True
+        )
+    except ImportError:
+        app.add_middleware(
+            GZipMiddleware,
+            minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+            compresslevel=settings.COMPRESSION_LEVEL
+        )
+
     # CORS 设置 - 允许前端访问
     app.add_middleware(
         CORSMiddleware,
@@ -22,6 +85,7 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["ETag", "X-Near-Duplicate-Of", "X-Near-Duplicate-Similarity"],
     )
 
     # 注册路由
@@ -29,6 +93,7 @@ def create_app() -> FastAPI:
     app.include_router(auth.router, prefix="/api/v1/auth", tags=["Auth"])
     app.include_router(dimensions.router, prefix="/api/v1/dimensions", tags=["Dimensions"])
     app.include_router(history.router, prefix="/api/v1/history", tags=["History"])
+    app.include_router(usage.router, prefix="/api/v1/usage", tags=["Usage"])
     app.include_router(analysis.router, prefix="/api/v1", tags=["Analysis"])
 
     return app
@@ -37,5 +102,5 @@ app = create_app()
 
 if __name__ == "__main__":
     import uvicorn
-    # 仅用于本地调试运行，生产环境建议使用命令行启动
+    # 仅用于本地调试运行，生产环境请使用 `python -m app.server` 或 gunicorn 启动
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
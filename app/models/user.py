@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, JSON, Float
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -42,4 +42,32 @@ class AnalysisHistory(Base):
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    owner = relationship("User", back_populates="history_records")
\ No newline at end of file
+    owner = relationship("User", back_populates="history_records")
+
+# LLM 用量记录 (按批次聚合写入，每行为一个刷新周期内某用户某模型的累计值)
+class LLMUsage(Base):
+    __tablename__ = "llm_usage"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    model = Column(String, index=True)
+    requests = Column(Integer, default=0)
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    cost = Column(Float, default=0.0)  # 估算费用 (按 MODEL_PRICING 计算)
+    created_at = Column(DateTime(timezone=True), index=True)
+
+
+# 代码指纹 (近似重复检测)：保存已完成分析的 winnowing 指纹与结果，供相似代码复用
+class AnalysisFingerprint(Base):
+    __tablename__ = "analysis_fingerprints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    language = Column(String, index=True)
+    config_key = Column(String, index=True)       # 维度、自定义定义、指令、模型等影响结果的配置摘要
+    fingerprints = Column(JSON, nullable=False)   # [[hash, line], ...]
+    fingerprint_count = Column(Integer, index=True)  # 去重后的指纹数量，用于候选预筛选
+    line_count = Column(Integer)
+    result = Column(JSON, nullable=False)         # AnalysisResponse
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
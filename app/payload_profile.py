@@ -0,0 +1,122 @@
+"""
+响应体积与序列化耗时测量
+
+用法: python -m app.payload_profile [--records 10] [--issues 50] [--code-kb 20]
+构造与 GET /api/v1/history 结构相同的响应数据 (包含代码与分析结果)，
+对比标准库 json、Pydantic (FastAPI response_model 路径) 与 orjson (ETag 列表接口路径)
+的序列化耗时，以及原始 / gzip / brotli 的传输体积；结果记录在 README 的「性能测量」一节
+"""
+import argparse
+import gzip
+import json
+import random
+import string
+import time
+from datetime import datetime, timezone
+from typing import List
+
+import orjson
+from pydantic import TypeAdapter
+
+from app.core.models import HistoryOut
+
+def build_history(records: int, issues: int, code_kb: int) -> list:
+    """生成模拟的历史记录列表"""
+    rnd = random.Random(0)
+    words = ["def", "return", "for", "in", "if", "else", "self", "value", "result", "items", "len", "range"]
+
+    def code() -> str:
+        lines, size = [], 0
+        while size < code_kb * 1024:
+            line = "    " * rnd.randint(0, 3) + " ".join(rnd.choice(words) for _ in range(rnd.randint(3, 10)))
+            lines.append(line)
+            size += len(line) + 1
+        return "\n".join(lines)
+
+    def issue(i: int) -> dict:
+        return {
+            "dimension": rnd.choice(["correctness", "security", "efficiency", "可读性"]),
+            "type": rnd.choice(["Error", "Warning", "Info"]),
+            "description": "变量可能未初始化，" + "".join(rnd.choices(string.ascii_letters, k=40)),
+            "line": i + 1,
+            "suggestion": "建议在使用前进行初始化并添加边界检查。",
+        }
+
+    return [
+        {
+            "id": n,
+            "type": "detection",
+            "data": {
+                "code": code(),
+                "language": "Python",
+                "dimensions": ["correctness", "security"],
+                "result": {"score": rnd.randint(0, 100), "issues": [issue(i) for i in range(issues)]},
+            },
+            "created_at": datetime.now(timezone.utc),
+        }
+        for n in range(records)
+    ]
+
+def _timeit(fn, repeat: int) -> float:
+    """返回单次调用的平均耗时 (毫秒)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure response serialization and compression")
+    parser.add_argument("--records", type=int, default=10)
+    parser.add_argument("--issues", type=int, default=50)
+    parser.add_argument("--code-kb", type=int, default=20)
+    parser.add_argument("--gzip-level", type=int, default=6)
+    parser.add_argument("--brotli-quality", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    payload = build_history(args.records, args.issues, args.code_kb)
+    # 标准库路径与 FastAPI JSONResponse 一致 (datetime 需先转为字符串)
+    std_payload = [dict(item, created_at=item["created_at"].isoformat()) for item in payload]
+
+    def std_dumps():
+        return json.dumps(std_payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+    # FastAPI 声明 response_model 时由 Pydantic 校验并直接序列化为 JSON 字节
+    adapter = TypeAdapter(List[HistoryOut])
+
+    def pydantic_dumps():
+        return adapter.dump_json(adapter.validate_python(payload))
+
+    def orjson_dumps():
+        return orjson.dumps(payload)
+
+    raw = orjson_dumps()
+    std_ms = _timeit(std_dumps, args.repeat)
+    pydantic_ms = _timeit(pydantic_dumps, args.repeat)
+    orjson_ms = _timeit(orjson_dumps, args.repeat)
+    gzip_ms = _timeit(lambda: gzip.compress(raw, compresslevel=args.gzip_level), args.repeat)
+    gzipped = gzip.compress(raw, compresslevel=args.gzip_level)
+
+    print(f"payload: {args.records} records x {args.issues} issues, ~{args.code_kb} KB code each\n")
+    print("serialization")
+    print(f"  json (stdlib)   {std_ms:8.2f} ms")
+    print(f"  pydantic        {pydantic_ms:8.2f} ms  ({std_ms / pydantic_ms:.1f}x faster, incl. validation)")
+    print(f"  orjson          {orjson_ms:8.2f} ms  ({std_ms / orjson_ms:.1f}x faster)")
+    print("\ntransfer size")
+    print(f"  raw             {len(raw) / 1024:8.1f} KB")
+    print(f"  gzip -{args.gzip_level}         {len(gzipped) / 1024:8.1f} KB  "
+          f"({100 * (1 - len(gzipped) / len(raw)):.0f}% saved, {gzip_ms:.2f} ms)")
+
+    try:
+        import brotli
+    except ImportError:
+        print("  brotli          (not installed)")
+    else:
+        br_ms = _timeit(lambda: brotli.compress(raw, quality=args.brotli_quality), args.repeat)
+        br = brotli.compress(raw, quality=args.brotli_quality)
+        print(f"  brotli q{args.brotli_quality}       {len(br) / 1024:8.1f} KB  "
+              f"({100 * (1 - len(br) / len(raw)):.0f}% saved, {br_ms:.2f} ms)")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
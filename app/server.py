@@ -0,0 +1,29 @@
+"""
+生产环境启动入口 (多 worker，无热重载)
+
+用法: python -m app.server
+数据库建表在主进程中执行一次，之后再启动 worker 进程
+"""
+import os
+
+def main():
+    # 必须在导入 settings 之前设置，worker 子进程会继承该环境变量，不再各自建表
+    os.environ["AUTO_CREATE_TABLES"] = "false"
+
+    import uvicorn
+    from app.core.config import settings
+    from app.core.database import engine, init_db
+
+    init_db()
+    engine.dispose()
+    uvicorn.run(
+        "app.main:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=settings.WEB_CONCURRENCY,
+        timeout_graceful_shutdown=int(settings.SHUTDOWN_DRAIN_TIMEOUT),
+        proxy_headers=True,
+    )
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
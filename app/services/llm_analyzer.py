@@ -1,12 +1,18 @@
 import json
 import re
-from openai import AsyncOpenAI
+from contextlib import nullcontext
+from typing import Optional
 from app.core.config import settings
+from app.services.scheduler import FairScheduler
+from app.services.usage import usage_tracker
 from app.core.models import AnalysisRequest, AnalysisResponse, ComparisonRequest, ComparisonResponse, IssueDetail
 
 DEFAULT_BASE_URL = "https://api.agicto.cn/v1"
 DEFAULT_MODEL = "deepseek-v3.1"
 
+# 分析失败时返回的系统问题所属维度
+SYSTEM_DIMENSION = "系统"
+
 # 可选择的云端模型白名单
 AVAILABLE_MODELS = {
     "qwen3-coder-plus",
@@ -16,19 +22,90 @@ AVAILABLE_MODELS = {
     "gemini-3-pro-preview",
 }
 
+class ServiceDraining(Exception):
+    """服务正在关闭 (排空进行中的调用)，不再接收新的 LLM 调用"""
+    pass
+
+def _new_client(api_key: str, base_url: str):
+    """创建 OpenAI 兼容客户端；openai SDK 导入较慢，推迟到首次使用时导入"""
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=api_key, base_url=base_url)
+
 class LLMService:
     def __init__(self):
-        # 1. 云端客户端 (默认)
-        self.client = AsyncOpenAI(
-            api_key=settings.OPENAI_API_KEY,
-            base_url=DEFAULT_BASE_URL
-        )
-
-        # 2. 预设的本地客户端 (兼容旧配置)
-        self.default_local_client = AsyncOpenAI(
-            api_key=settings.LOCAL_LLM_API_KEY,
-            base_url=settings.LOCAL_LLM_BASE_URL
-        )
+        # 客户端在首次使用时创建 (见 client / default_local_client)，缩短进程冷启动时间
+        self._client = None
+        self._default_local_client = None
+
+        # 收到退出信号后进入排空状态，不再接收新的 LLM 调用
+        self._draining = False
+
+        # 共享上游的并发控制，饱和时按用户公平排队
+        self.scheduler = FairScheduler(settings.LLM_MAX_CONCURRENCY)
+
+    @property
+    def client(self):
+        """云端客户端 (默认)"""
+        if self._client is None:
+            self._client = _new_client(settings.OPENAI_API_KEY, DEFAULT_BASE_URL)
+        return self._client
+
+    @property
+    def default_local_client(self):
+        """预设的本地客户端 (兼容旧配置)"""
+        if self._default_local_client is None:
+            self._default_local_client = _new_client(settings.LOCAL_LLM_API_KEY, settings.LOCAL_LLM_BASE_URL)
+        return self._default_local_client
+
+    @property
+    def is_draining(self) -> bool:
+        return self._draining
+
+    async def startup(self):
+        """应用启动时调用；客户端按需创建，这里不做预热"""
+        self._draining = False
+
+    def begin_drain(self):
+        """进入排空状态：新的分析请求返回 503，就绪探针返回 503 (可在信号处理函数中调用)"""
+        self._draining = True
+
+    async def shutdown(self):
+        """
+        关闭客户端
+        进行中的请求已由 uvicorn 在 timeout_graceful_shutdown 内等待完成 (超时则取消)，这里无需再等待
+        """
+        self._draining = True
+        for client in (self._client, self._default_local_client):
+            if client is not None:
+                await client.close()
+        self._client = None
+        self._default_local_client = None
+
+    def _check_accepting(self):
+        """排空期间拒绝新的 LLM 调用，在进入公平调度队列之前检查"""
+        if self._draining:
+            raise ServiceDraining("服务正在关闭，暂不接收新的分析请求")
+
+    def _is_shared_client(self, client) -> bool:
+        # 比较私有属性，避免触发客户端的惰性创建
+        return client is self._client or client is self._default_local_client
+
+    def _upstream_slot(self, client, user_id: Optional[int]):
+        """共享客户端的调用需经过公平调度，用户自带的本地服务不受限制"""
+        if self._is_shared_client(client):
+            return self.scheduler.slot(user_id)
+        return nullcontext()
+
+    async def _release_client(self, client):
+        """关闭按请求临时创建的客户端，共享客户端不做处理"""
+        if not self._is_shared_client(client):
+            await client.close()
+
+    async def check_upstream(self, timeout: float) -> None:
+        """检查云端 LLM 服务是否可达，失败时抛出异常"""
+        if self._draining:
+            raise RuntimeError("LLM service is shutting down")
+        await self.client.with_options(timeout=timeout, max_retries=0).models.list()
 
     def _build_dimension_instruction(self, dimensions: list, custom_defs: dict) -> str:
         """辅助函数：构建维度说明"""
@@ -56,7 +133,7 @@ class LLMService:
         if req.local_config and req.local_config.base_url:
             print(f"Using Custom Local LLM at: {req.local_config.base_url}")
             # 动态创建客户端
-            client = AsyncOpenAI(
+            client = _new_client(
                 api_key=req.local_config.api_key or "EMPTY",
                 base_url=req.local_config.base_url
             )
@@ -71,7 +148,13 @@ class LLMService:
         model = req.model_name if req.model_name in AVAILABLE_MODELS else DEFAULT_MODEL
         return self.client, model
 
-    async def analyze_code(self, req: AnalysisRequest) -> AnalysisResponse:
+    async def analyze_code(
+        self,
+        req: AnalysisRequest,
+        user_id: Optional[int] = None,
+        reference: Optional[AnalysisResponse] = None
+    ) -> AnalysisResponse:
+        """reference: 相似代码的历史分析结果 (行号已对齐)，作为参考附在 prompt 中"""
         dim_instruction = self._build_dimension_instruction(req.dimensions, req.custom_definitions)
         
         system_prompt = """
@@ -97,44 +180,59 @@ class LLMService:
         if getattr(req, 'generation_instruction', None):
             instruction_part = f"\n请结合以下代码指令进行分析：\n{req.generation_instruction}\n"
 
+        reference_part = ""
+        if reference is not None:
+            reference_part = (
+                "\n以下是与当前代码高度相似的历史代码的分析结果 (行号已对齐到当前代码)，仅供参考，"
+                f"请以当前代码为准进行核实、修正和补充：\n{reference.model_dump_json()}\n"
+            )
+
         user_prompt = f"""
         编程语言: {req.language if req.language != 'Auto' else '根据代码内容判断'}
         检测维度: {', '.join(req.dimensions)}
-        {instruction_part}
+        {instruction_part}{reference_part}
         代码内容:
         {req.code_content}
         """
 
         try:
+            self._check_accepting()
             target_client, model_to_use = self._get_client_and_model(req)
-            
-            response = await target_client.chat.completions.create(
-                model=model_to_use,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.2,
-                response_format={"type": "json_object"} 
-            )
+            try:
+                async with self._upstream_slot(target_client, user_id):
+                    response = await target_client.chat.completions.create(
+                        model=model_to_use,
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": user_prompt}
+                        ],
+                        temperature=0.2,
+                        response_format={"type": "json_object"} 
+                    )
+            finally:
+                await self._release_client(target_client)
+            usage_tracker.record(user_id, model_to_use, response.usage)
             
             content = response.choices[0].message.content
             data = json.loads(self._clean_json_string(content))
             return AnalysisResponse(**data)
             
+        except ServiceDraining:
+            # 交由接口层返回 503，客户端可改投其他实例重试
+            raise
         except Exception as e:
             print(f"LLM Error: {e}")
             return AnalysisResponse(
                 score=0,
                 issues=[IssueDetail(
-                    dimension="系统",
+                    dimension=SYSTEM_DIMENSION,
                     type="Error",
                     description=f"模型分析失败: {str(e)}",
                     suggestion="请检查 API Key 配置、本地服务地址或网络连接"
                 )]
             )
 
-    async def compare_codes(self, req: ComparisonRequest) -> ComparisonResponse:
+    async def compare_codes(self, req: ComparisonRequest, user_id: Optional[int] = None) -> ComparisonResponse:
         dim_instruction = self._build_dimension_instruction(req.dimensions, req.custom_definitions)
 
         system_prompt = """
@@ -169,17 +267,22 @@ class LLMService:
         """
 
         try:
+            self._check_accepting()
             target_client, model_to_use = self._get_client_and_model(req)
-
-            response = await target_client.chat.completions.create(
-                model=model_to_use, 
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.2,
-                response_format={"type": "json_object"}
-            )
+            try:
+                async with self._upstream_slot(target_client, user_id):
+                    response = await target_client.chat.completions.create(
+                        model=model_to_use, 
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": user_prompt}
+                        ],
+                        temperature=0.2,
+                        response_format={"type": "json_object"}
+                    )
+            finally:
+                await self._release_client(target_client)
+            usage_tracker.record(user_id, model_to_use, response.usage)
             
             content = response.choices[0].message.content
             data = json.loads(self._clean_json_string(content))
@@ -193,6 +296,9 @@ class LLMService:
                 details_b=None
             )
             
+        except ServiceDraining:
+            # 交由接口层返回 503，客户端可改投其他实例重试
+            raise
         except Exception as e:
             return ComparisonResponse(
                 summary=f"对比失败: {str(e)}",
@@ -0,0 +1,293 @@
+import hashlib
+import json
+import re
+import zlib
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import desc
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.models import AnalysisRequest, AnalysisResponse
+from app.models.user import AnalysisFingerprint
+
+# winnowing 参数：K_GRAM 个 token 组成一个 k-gram，每 WINDOW 个连续 k-gram 取一个指纹
+K_GRAM = 5
+WINDOW = 4
+
+# 常见语言关键字，归一化时保留；局部标识符统一替换为 "V"，使变量重命名不影响指纹
+KEYWORDS = frozenset("""
+    and as assert async await break case catch class const continue def default defer del do elif else
+    enum except export extends false final finally fn for from func function go goto if impl implements
+    import in instanceof interface is lambda let loop match mod mut new nil none not null or package pass
+    private protected pub public raise return self static struct super switch this throw throws trait
+    true try type typeof union unsafe use using var void while with yield
+    int long short float double char bool boolean string str byte unsigned signed auto
+""".split())
+
+# 各语言的行注释前缀，未列出的语言 (含 Auto) 先按代码特征猜测，无法判断时同时按 C 风格与 # 风格处理
+_LINE_COMMENTS = {
+    "python": ("#",),
+    "ruby": ("#",),
+    "shell": ("#",),
+    "bash": ("#",),
+    "r": ("#",),
+    "perl": ("#",),
+    "sql": ("--",),
+    "lua": ("--",),
+    "haskell": ("--",),
+}
+_C_STYLE_LANGUAGES = {
+    "c", "c++", "cpp", "c#", "csharp", "java", "javascript", "typescript", "go", "rust",
+    "kotlin", "swift", "php", "scala", "dart",
+}
+
+@lru_cache(maxsize=None)
+def _token_pattern(language: str) -> "re.Pattern":
+    lang = language.strip().lower()
+    if lang in _LINE_COMMENTS:
+        line_comments, block_comment = _LINE_COMMENTS[lang], False
+    elif lang in _C_STYLE_LANGUAGES:
+        line_comments, block_comment = ("//",), True
+    else:
+        line_comments, block_comment = ("//", "#"), True
+
+    comments = [re.escape(prefix) + r"[^\n]*" for prefix in line_comments]
+    if block_comment:
+        comments.append(r"/\*.*?(?:\*/|\Z)")
+
+    # 字符串未闭合时不会匹配失败：单行字符串到行尾结束，跨行字符串与块注释到输入末尾结束
+    # (包括末尾落单的反斜杠)；反斜杠只能按 \\. 一种方式匹配。这样既不会回溯爆炸 (指数级)，
+    # 也不会让每个未闭合的起始符重复扫描到行尾或末尾 (平方级)
+    return re.compile(
+        r'(?P<string>"""(?:\\.|[^\\])*?(?:"""|\\?\Z)|\'\'\'(?:\\.|[^\\])*?(?:\'\'\'|\\?\Z)'
+        r'|"(?:\\.|[^"\\\n])*(?:"|\\?$)|\'(?:\\.|[^\'\\\n])*(?:\'|\\?$)'
+        r'|`(?:\\.|[^`\\])*(?:`|\\?\Z))'
+        r"|(?P<comment>" + "|".join(comments) + r")"
+        r"|(?P<ident>[A-Za-z_]\w*)"
+        r"|(?P<number>\d+(?:\.\d+)?)"
+        r"|(?P<space>\s+)"
+        r"|(?P<other>.)",
+        re.DOTALL | re.MULTILINE,
+    )
+
+# Auto 模式下用于猜测注释语法的特征：C 预处理指令按 C 风格处理，Python 语句按 # 风格处理，
+# 避免把 Python 的整除运算符 // 或 C 的 #include、#define 当作注释丢弃
+_C_PREPROCESSOR = re.compile(r"^[ \t]*#[ \t]*(?:include|define|undef|ifdef|ifndef|endif|pragma)\b", re.MULTILINE)
+_PYTHON_STATEMENT = re.compile(
+    r"^[ \t]*(?:(?:def|class|if|elif|for|while|with|except)\b[^\n]*|else|try|finally):[ \t]*$"
+    r"|^[ \t]*(?:from[ \t]+[\w.]+[ \t]+)?import[ \t]+[\w.]+(?:[ \t]*,[ \t]*[\w.]+)*[ \t]*$",
+    re.MULTILINE,
+)
+
+def _comment_language(code: str, language: str) -> str:
+    """返回用于选择注释语法的语言名，未知语言时根据代码特征猜测"""
+    lang = language.strip().lower()
+    if lang in _LINE_COMMENTS or lang in _C_STYLE_LANGUAGES:
+        return lang
+    if _C_PREPROCESSOR.search(code):
+        return "c"
+    if _PYTHON_STATEMENT.search(code):
+        return "python"
+    return lang
+
+# 紧跟其后的名称是声明 (函数 / 类名)，即使后面是 "(" 也按普通标识符归一化
+_DECLARATION_KEYWORDS = frozenset({"def", "function", "fn", "func", "class", "struct", "interface", "trait"})
+
+def normalize_tokens(code: str, language: str) -> List[Tuple[str, int]]:
+    """
+    token 级归一化：去除注释与空白，局部标识符替换为 "V"
+    关键字、被调用的名称 (如 eval(、len() 与属性名 (如 .md5) 保留原文，
+    这样换用不同 API 的代码不会被判定为重复
+    返回 [(归一化 token, 所在行号)]
+    """
+    raw = []
+    line, last = 1, 0
+    for m in _token_pattern(_comment_language(code, language)).finditer(code):
+        kind = m.lastgroup
+        if kind in ("space", "comment"):
+            continue
+        line += code.count("\n", last, m.start())
+        last = m.start()
+        raw.append((kind, m.group(), line))
+
+    tokens = []
+    for i, (kind, text, line) in enumerate(raw):
+        if kind == "ident" and text.lower() not in KEYWORDS:
+            prev = raw[i - 1][1] if i > 0 else ""
+            prev2 = raw[i - 2][1] if i > 1 else ""
+            nxt = raw[i + 1][1] if i + 1 < len(raw) else ""
+            is_attribute = prev == "." or (prev2, prev) in ((":", ":"), ("-", ">"))
+            is_call = nxt == "(" and prev.lower() not in _DECLARATION_KEYWORDS
+            if not (is_attribute or is_call):
+                text = "V"
+        tokens.append((text, line))
+    return tokens
+
+def winnow(tokens: List[Tuple[str, int]], k: int = K_GRAM, window: int = WINDOW) -> List[Tuple[int, int]]:
+    """对 k-gram 哈希做 winnowing，返回 [(指纹哈希, 起始行号)]"""
+    if not tokens:
+        return []
+    if len(tokens) < k:
+        k = len(tokens)
+
+    # crc32 在不同进程间稳定 (内置 hash() 会随机化)
+    grams = [
+        (zlib.crc32("\x00".join(t for t, _ in tokens[i:i + k]).encode()), tokens[i][1])
+        for i in range(len(tokens) - k + 1)
+    ]
+    if len(grams) <= window:
+        return [min(grams, key=lambda g: g[0])]
+
+    fingerprints = []
+    last_pos = -1
+    for start in range(len(grams) - window + 1):
+        # 取窗口内最小哈希，相同时取最右侧
+        pos = min(range(start, start + window), key=lambda i: (grams[i][0], -i))
+        if pos != last_pos:
+            fingerprints.append(grams[pos])
+            last_pos = pos
+    return fingerprints
+
+def fingerprint(code: str, language: str) -> List[Tuple[int, int]]:
+    return winnow(normalize_tokens(code, language))
+
+def similarity(a: List[Tuple[int, int]], b: List[Tuple[int, int]]) -> float:
+    """指纹集合的 Jaccard 相似度"""
+    set_a, set_b = {h for h, _ in a}, {h for h, _ in b}
+    if not set_a or not set_b:
+        return 0.0
+    return len(set_a & set_b) / len(set_a | set_b)
+
+def remap_lines(result: dict, old_fp: List[Tuple[int, int]], new_fp: List[Tuple[int, int]], line_count: int) -> dict:
+    """根据匹配的指纹把历史结果中 issue 的行号映射到新代码"""
+    new_lines = defaultdict(list)
+    for h, line in new_fp:
+        new_lines[h].append(line)
+
+    votes: Dict[int, Counter] = defaultdict(Counter)
+    for h, old_line in old_fp:
+        for new_line in new_lines.get(h, ()):
+            votes[old_line][new_line] += 1
+    mapping = {old: c.most_common(1)[0][0] for old, c in votes.items()}
+
+    def map_line(line: Optional[int]) -> Optional[int]:
+        if line is None or not mapping:
+            return line
+        if line in mapping:
+            return mapping[line]
+        # 未直接匹配的行按最近的已匹配行的偏移量平移
+        nearest = min(mapping, key=lambda old: abs(old - line))
+        return max(1, min(line_count, line + mapping[nearest] - nearest))
+
+    remapped = dict(result)
+    remapped["issues"] = [dict(issue, line=map_line(issue.get("line"))) for issue in result.get("issues", [])]
+    return remapped
+
+def config_key(req: AnalysisRequest) -> str:
+    """影响分析结果的配置摘要：只有配置一致的历史结果才可复用"""
+    dims = sorted(req.dimensions)
+    payload = {
+        "dimensions": dims,
+        "custom": {d: req.custom_definitions[d] for d in dims if d in req.custom_definitions},
+        "instruction": (req.generation_instruction or "").strip(),
+        "model": req.model_name or "",
+        "local": [req.local_config.base_url, req.local_config.model_name] if req.local_config else None,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+@dataclass
+class NearDuplicateMatch:
+    entry_id: int
+    similarity: float
+    result: AnalysisResponse  # 行号已映射到当前代码
+
+class NearDuplicateIndex:
+    """
+    近似重复代码索引
+    以 token 归一化 + winnowing 指纹判断新提交与历史分析的相似度，
+    同一语言、同一检测配置下找到足够相似的记录时复用其结果或作为 LLM 的参考
+    """
+
+    def lookup(self, user_id: int, req: AnalysisRequest) -> Tuple[List[Tuple[int, int]], Optional[NearDuplicateMatch]]:
+        """返回当前代码的指纹及最相似的历史记录 (相似度达到复用或参考阈值时)"""
+        if len(req.code_content) > settings.NEAR_DUP_MAX_CODE_LENGTH:
+            return [], None
+        new_fp = fingerprint(req.code_content, req.language)
+        threshold = settings.NEAR_DUP_SEED_THRESHOLD
+        if settings.NEAR_DUP_REUSE_ENABLED:
+            threshold = min(threshold, settings.NEAR_DUP_REUSE_THRESHOLD)
+        count = len({h for h, _ in new_fp})
+        if not count or threshold > 1:
+            return new_fp, None
+
+        db = SessionLocal()
+        try:
+            query = db.query(
+                AnalysisFingerprint.id, AnalysisFingerprint.fingerprints
+            ).filter(
+                AnalysisFingerprint.language == req.language,
+                AnalysisFingerprint.config_key == config_key(req)
+            )
+            if threshold > 0:
+                # Jaccard 相似度不超过 min(|A|,|B|) / max(|A|,|B|)，据此预筛选候选
+                query = query.filter(
+                    AnalysisFingerprint.fingerprint_count >= count * threshold,
+                    AnalysisFingerprint.fingerprint_count <= count / threshold,
+                )
+            if not settings.NEAR_DUP_SHARED:
+                query = query.filter(AnalysisFingerprint.user_id == user_id)
+            candidates = query.order_by(desc(AnalysisFingerprint.id)).limit(settings.NEAR_DUP_MAX_ENTRIES).all()
+
+            best_id, best_fp, best_sim = None, None, 0.0
+            for entry_id, old_fp in candidates:
+                sim = similarity(old_fp, new_fp)
+                if sim > best_sim:
+                    best_id, best_fp, best_sim = entry_id, old_fp, sim
+            if best_id is None or best_sim < threshold:
+                return new_fp, None
+
+            entry = db.query(AnalysisFingerprint).filter(AnalysisFingerprint.id == best_id).first()
+            line_count = req.code_content.count("\n") + 1
+            result = remap_lines(entry.result, best_fp, new_fp, line_count)
+            return new_fp, NearDuplicateMatch(best_id, best_sim, AnalysisResponse(**result))
+        except Exception as e:
+            # 检索失败不影响正常分析
+            print(f"Fingerprint lookup error: {e}")
+            return new_fp, None
+        finally:
+            db.close()
+
+    def store(self, user_id: int, req: AnalysisRequest, fp: List[Tuple[int, int]], result: AnalysisResponse) -> None:
+        """保存一次成功分析的指纹与结果，超出 NEAR_DUP_MAX_ENTRIES 时删除最旧的记录"""
+        if not fp:
+            return
+        db = SessionLocal()
+        try:
+            db.add(AnalysisFingerprint(
+                user_id=user_id,
+                language=req.language,
+                config_key=config_key(req),
+                fingerprints=[list(item) for item in fp],
+                fingerprint_count=len({h for h, _ in fp}),
+                line_count=req.code_content.count("\n") + 1,
+                result=result.model_dump(),
+            ))
+            db.flush()
+
+            stale = db.query(AnalysisFingerprint.id).filter(
+                AnalysisFingerprint.user_id == user_id
+            ).order_by(desc(AnalysisFingerprint.id)).offset(settings.NEAR_DUP_MAX_ENTRIES).all()
+            if stale:
+                db.query(AnalysisFingerprint).filter(
+                    AnalysisFingerprint.id.in_([row.id for row in stale])
+                ).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Fingerprint store error: {e}")
+        finally:
+            db.close()
+
+near_duplicate_index = NearDuplicateIndex()
@@ -0,0 +1,77 @@
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Hashable
+
+class FairScheduler:
+    """
+    上游 LLM 并发控制与多用户公平调度
+    并发未满时直接放行；并发已满时按用户分队列排队，释放的名额在用户之间轮转分配，
+    避免单个用户的大量请求占满上游、饿死其他用户
+    """
+
+    def __init__(self, limit: int = 0):
+        self.limit = limit  # 0 表示不限制并发
+        self._active = 0
+        self._queues: "OrderedDict[Hashable, Deque[asyncio.Future]]" = OrderedDict()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def waiting_by_user(self) -> Dict[Hashable, int]:
+        return {key: len(q) for key, q in self._queues.items()}
+
+    @asynccontextmanager
+    async def slot(self, key: Hashable):
+        """占用一个上游调用名额，key 通常为用户 ID"""
+        if self.limit <= 0:
+            yield
+            return
+
+        await self._acquire(key)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, key: Hashable):
+        if self._active < self.limit and not self._queues:
+            self._active += 1
+            return
+
+        fut = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(key, deque()).append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # 名额已分配但调用方被取消，归还名额
+                self._release()
+            else:
+                queue = self._queues.get(key)
+                if queue is not None and fut in queue:
+                    queue.remove(fut)
+                    if not queue:
+                        del self._queues[key]
+            raise
+
+    def _release(self):
+        self._active -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._active < self.limit and self._queues:
+            # 取队首用户的一个请求，然后把该用户移到队尾 (轮转)
+            key, queue = self._queues.popitem(last=False)
+            fut = queue.popleft()
+            if queue:
+                self._queues[key] = queue
+            if fut.done():
+                continue
+            self._active += 1
+            fut.set_result(None)
\ No newline at end of file
@@ -0,0 +1,235 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.user import LLMUsage
+
+def today_start() -> datetime:
+    """当前 UTC 日的零点，配额按 UTC 日计算"""
+    return datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """按 MODEL_PRICING 估算一次调用的费用"""
+    price = settings.MODEL_PRICING.get(model)
+    if not price:
+        return 0.0
+    prompt_price = price[0]
+    completion_price = price[1] if len(price) > 1 else price[0]
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+class QuotaExceeded(Exception):
+    pass
+
+class UsageTracker:
+    """
+    用户 LLM 用量统计
+    record() 只在内存中累加，后台任务每 USAGE_FLUSH_INTERVAL 秒批量写库一次，
+    分析请求本身不会产生额外的同步数据库写入
+    """
+
+    def __init__(self):
+        # 待写库的累计值: (user_id, model) -> [requests, prompt_tokens, completion_tokens, cost]
+        self._pending: Dict[Tuple[int, str], List[float]] = {}
+        # 正在写库的批次，写入完成前仍计入配额
+        self._flushing: Dict[Tuple[int, str], List[float]] = {}
+        # 已写库的批次数与正在写库批次的序号，用于判断基线是否已包含该批次
+        self._written = 0
+        self._flushing_seq = 0
+        # 配额基线 (已落库的当日用量): user_id -> (day, requests, tokens, 加载前已写库的批次数)
+        self._baseline: Dict[int, Tuple[datetime, int, int, int]] = {}
+        # 已通过配额检查、尚未完成的请求数: user_id -> count
+        self._reserved: Dict[int, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def startup(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def record(self, user_id: Optional[int], model: str, usage) -> None:
+        """记录一次 LLM 调用，usage 为 OpenAI 响应中的 usage 字段 (可能为空)"""
+        if user_id is None:
+            return
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+
+        entry = self._pending.setdefault((user_id, model), [0, 0, 0, 0.0])
+        entry[0] += 1
+        entry[1] += prompt_tokens
+        entry[2] += completion_tokens
+        entry[3] += estimate_cost(model, prompt_tokens, completion_tokens)
+
+    def pending_for(self, user_id: int, include_flushing: bool = True) -> Dict[str, List[float]]:
+        """当前 worker 中尚未落库的用量，按模型汇总"""
+        result: Dict[str, List[float]] = {}
+        batches = (self._flushing, self._pending) if include_flushing else (self._pending,)
+        for batch in batches:
+            for (uid, model), values in batch.items():
+                if uid != user_id:
+                    continue
+                entry = result.setdefault(model, [0, 0, 0, 0.0])
+                for i, v in enumerate(values):
+                    entry[i] += v
+        return result
+
+    @asynccontextmanager
+    async def reserve(self, user_id: int):
+        """
+        检查用户当日配额并为本次请求预占一个请求名额，超出时抛出 QuotaExceeded
+        预占在退出时释放 (实际用量由 record() 计入)，避免并发请求在用量记录前同时通过检查
+        """
+        if settings.USAGE_DAILY_REQUEST_LIMIT <= 0 and settings.USAGE_DAILY_TOKEN_LIMIT <= 0:
+            yield
+            return
+
+        await self._ensure_baseline(user_id)
+        # 检查与预占之间没有 await，同一 worker 内不会被其他请求插入
+        self._check_limits(user_id)
+        self._reserved[user_id] = self._reserved.get(user_id, 0) + 1
+        try:
+            yield
+        finally:
+            self._reserved[user_id] -= 1
+            if not self._reserved[user_id]:
+                del self._reserved[user_id]
+
+    async def _ensure_baseline(self, user_id: int) -> None:
+        today = today_start()
+        baseline = self._baseline.get(user_id)
+        if baseline is None or baseline[0] != today:
+            # 每个用户每天只在首次请求时读一次库，之后随批量写库一起刷新
+            while True:
+                written = self._written
+                totals = await run_in_threadpool(self._load_totals, [user_id], today)
+                # 加载期间有批次写库完成时，结果可能不含该批次而 _flushing 即将清空，重新加载
+                if written == self._written:
+                    break
+            self._baseline[user_id] = (today, *totals.get(user_id, (0, 0)), written)
+
+    def _check_limits(self, user_id: int) -> None:
+        request_limit = settings.USAGE_DAILY_REQUEST_LIMIT
+        token_limit = settings.USAGE_DAILY_TOKEN_LIMIT
+
+        baseline = self._baseline[user_id]
+        requests = baseline[1] + self._reserved.get(user_id, 0)
+        tokens = baseline[2]
+        # 基线在正在写库的批次写入完成后才加载时已包含该批次，不再重复计入
+        include_flushing = baseline[3] < self._flushing_seq
+        for values in self.pending_for(user_id, include_flushing).values():
+            requests += values[0]
+            tokens += values[1] + values[2]
+
+        if request_limit > 0 and requests >= request_limit:
+            raise QuotaExceeded(f"Daily request quota exceeded ({request_limit})")
+        if token_limit > 0 and tokens >= token_limit:
+            raise QuotaExceeded(f"Daily token quota exceeded ({token_limit})")
+
+    async def flush(self) -> None:
+        """把内存中的用量批量写库，并刷新配额基线"""
+        if self._pending:
+            self._flushing, self._pending = self._pending, {}
+            self._flushing_seq = self._written + 1
+            try:
+                await run_in_threadpool(self._write, self._flushing)
+            except Exception as e:
+                print(f"Usage flush error: {e}")
+                # 写库失败时合并回待写队列，下次重试
+                for key, values in self._flushing.items():
+                    entry = self._pending.setdefault(key, [0, 0, 0, 0.0])
+                    for i, v in enumerate(values):
+                        entry[i] += v
+                self._flushing = {}
+                return
+            self._written = self._flushing_seq
+
+        today = today_start()
+        written = self._written
+        user_ids = [uid for uid, b in self._baseline.items() if b[0] == today]
+        try:
+            totals = await run_in_threadpool(self._load_totals, user_ids, today) if user_ids else {}
+        except Exception as e:
+            print(f"Usage baseline refresh error: {e}")
+            totals = None
+
+        # 刷新期间其他请求可能新增了基线，只原地更新本次刷新的用户
+        if totals is not None:
+            for uid in user_ids:
+                self._baseline[uid] = (today, *totals.get(uid, (0, 0)), written)
+        else:
+            # 刷新失败时把已写库的批次直接累加到尚未包含它的基线上，避免清空 _flushing 后少计
+            for uid, values in self._batch_totals(self._flushing).items():
+                baseline = self._baseline.get(uid)
+                if baseline is not None and baseline[3] < self._flushing_seq:
+                    self._baseline[uid] = (
+                        baseline[0], baseline[1] + values[0], baseline[2] + values[1], self._flushing_seq
+                    )
+        for uid in [uid for uid, b in self._baseline.items() if b[0] != today]:
+            del self._baseline[uid]  # 跨日的旧基线直接丢弃
+        self._flushing = {}
+
+    @staticmethod
+    def _batch_totals(batch: Dict[Tuple[int, str], List[float]]) -> Dict[int, Tuple[int, int]]:
+        """按用户汇总批次中的请求数与 token 数"""
+        totals: Dict[int, Tuple[int, int]] = {}
+        for (user_id, _), values in batch.items():
+            requests, tokens = totals.get(user_id, (0, 0))
+            totals[user_id] = (requests + int(values[0]), tokens + int(values[1] + values[2]))
+        return totals
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(settings.USAGE_FLUSH_INTERVAL)
+            await self.flush()
+
+    @staticmethod
+    def _write(batch: Dict[Tuple[int, str], List[float]]) -> None:
+        now = datetime.now(timezone.utc)
+        db = SessionLocal()
+        try:
+            db.add_all([
+                LLMUsage(
+                    user_id=user_id,
+                    model=model,
+                    requests=int(values[0]),
+                    prompt_tokens=int(values[1]),
+                    completion_tokens=int(values[2]),
+                    cost=values[3],
+                    created_at=now,
+                )
+                for (user_id, model), values in batch.items()
+            ])
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _load_totals(user_ids: List[int], since: datetime) -> Dict[int, Tuple[int, int]]:
+        """查询用户自 since 起的请求数与 token 数"""
+        db = SessionLocal()
+        try:
+            rows = db.query(
+                LLMUsage.user_id,
+                func.coalesce(func.sum(LLMUsage.requests), 0),
+                func.coalesce(func.sum(LLMUsage.prompt_tokens + LLMUsage.completion_tokens), 0),
+            ).filter(
+                LLMUsage.user_id.in_(user_ids),
+                LLMUsage.created_at >= since
+            ).group_by(LLMUsage.user_id).all()
+            return {uid: (int(req), int(tok)) for uid, req, tok in rows}
+        finally:
+            db.close()
+
+usage_tracker = UsageTracker()
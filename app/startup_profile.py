@@ -0,0 +1,82 @@
+"""
+冷启动分析：统计导入 app.main 的耗时及各模块导入时间
+
+用法: python -m app.startup_profile [--top 20] [--budget-ms 1500]
+在全新的子进程中以 `-X importtime` 导入应用，超出预算或提前导入了
+应延迟加载的重量级依赖时以非零状态码退出，可直接用于 CI 检查
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# 项目根目录，子进程从这里导入 app 包
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 默认冷启动预算 (毫秒)，只统计导入与应用构建，不含 lifespan 中的建表
+DEFAULT_BUDGET_MS = 1500
+
+# 应在首次使用时才导入的重量级依赖
+LAZY_MODULES = ("openai", "passlib", "jose", "bcrypt")
+
+_CHILD_CODE = (
+    "import time; t = time.perf_counter(); import app.main; "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+def profile_import():
+    """在子进程中导入 app.main，返回 (总耗时 ms, [(模块名, 自身 us, 累计 us)])"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD_CODE],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=PROJECT_ROOT,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Failed to import app.main:\n{proc.stderr}")
+
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return float(proc.stdout.strip().splitlines()[-1]), modules
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Profile SmartCodeCheck cold start")
+    parser.add_argument("--top", type=int, default=20, help="显示耗时最多的模块数量")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="冷启动预算 (毫秒)")
+    args = parser.parse_args(argv)
+
+    total_ms, modules = profile_import()
+
+    # 按顶层包汇总各模块自身的导入耗时
+    packages = {}
+    for name, self_us, _ in modules:
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0) + self_us
+
+    print(f"import app.main: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)\n")
+    print(f"{'self ms':>14}  package")
+    for root, us in sorted(packages.items(), key=lambda x: -x[1])[:args.top]:
+        print(f"{us / 1000:>14.1f}  {root}")
+
+    print(f"\n{'self ms':>14}  module")
+    for name, self_us, _ in sorted(modules, key=lambda x: -x[1])[:args.top]:
+        print(f"{self_us / 1000:>14.1f}  {name}")
+
+    failed = False
+    eager = sorted({name.split(".")[0] for name, *_ in modules} & set(LAZY_MODULES))
+    if eager:
+        print(f"\nFAIL: heavy modules imported at startup: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"\nFAIL: cold start {total_ms:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
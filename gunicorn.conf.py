@@ -0,0 +1,31 @@
+# Gunicorn 生产配置: gunicorn -c gunicorn.conf.py app.main:app
+import os
+
+# 在 master 进程导入应用配置之前关闭自动建表，fork 出的 worker 会继承该设置
+os.environ["AUTO_CREATE_TABLES"] = "false"
+
+from uvicorn.workers import UvicornWorker
+from app.core.config import settings
+
+class Worker(UvicornWorker):
+    # UvicornWorker 不会把 graceful_timeout 传给 uvicorn，未设置时 worker 会一直等待慢请求，
+    # 直到被 master SIGKILL，lifespan 关闭 (写入剩余用量、关闭客户端) 就不会执行
+    CONFIG_KWARGS = {
+        **UvicornWorker.CONFIG_KWARGS,
+        "timeout_graceful_shutdown": int(settings.SHUTDOWN_DRAIN_TIMEOUT),
+    }
+
+bind = f"{settings.SERVER_HOST}:{settings.SERVER_PORT}"
+workers = settings.WEB_CONCURRENCY
+worker_class = Worker
+# 收到 SIGTERM 后 worker 依次: 就绪探针返回 503 (SHUTDOWN_READINESS_DELAY)、等待进行中请求
+# (SHUTDOWN_DRAIN_TIMEOUT)、执行 lifespan 关闭；master 需在这之后才 SIGKILL
+graceful_timeout = int(settings.SHUTDOWN_READINESS_DELAY + settings.SHUTDOWN_DRAIN_TIMEOUT) + 10
+timeout = 120
+
+def on_starting(server):
+    """master 进程启动时执行一次数据库建表"""
+    from app.core.database import engine, init_db
+    init_db()
+    # 释放 master 中的连接，避免 fork 后多个 worker 共享同一连接
+    engine.dispose()
\ No newline at end of file
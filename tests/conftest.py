@@ -0,0 +1,27 @@
+import os
+import tempfile
+
+import pytest
+
+# Settings 中的必填项；测试不访问真实的上游服务，数据库使用临时 SQLite 文件
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+os.environ.setdefault("READINESS_CHECK_UPSTREAM", "false")
+
+@pytest.fixture()
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    with TestClient(app) as c:
+        yield c
+
+@pytest.fixture()
+def auth_headers(client):
+    import uuid
+    username = f"user-{uuid.uuid4().hex[:8]}"
+    client.post("/api/v1/auth/register", json={"username": username, "password": "secret1"})
+    token = client.post(
+        "/api/v1/auth/login", data={"username": username, "password": "secret1"}
+    ).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
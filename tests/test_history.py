@@ -0,0 +1,25 @@
+def _create(client, headers, n):
+    resp = client.post("/api/v1/history/", headers=headers, json={"type": "detection", "data": {"n": n}})
+    return resp.json()["id"]
+
+def test_history_etag_not_modified(client, auth_headers):
+    _create(client, auth_headers, 1)
+    first = client.get("/api/v1/history/", headers=auth_headers)
+    assert first.status_code == 200
+
+    again = client.get("/api/v1/history/", headers={**auth_headers, "If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+    assert again.headers["etag"] == first.headers["etag"]
+
+def test_history_etag_changes_when_id_is_reused(client, auth_headers):
+    """SQLite 删除最新记录后会复用其 ID，ETag 不能因此误判为未修改"""
+    _create(client, auth_headers, 1)
+    newest = _create(client, auth_headers, 2)
+    etag = client.get("/api/v1/history/", headers=auth_headers).headers["etag"]
+
+    client.delete(f"/api/v1/history/{newest}", headers=auth_headers)
+    _create(client, auth_headers, 3)
+
+    resp = client.get("/api/v1/history/", headers={**auth_headers, "If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.json()[0]["data"] == {"n": 3}
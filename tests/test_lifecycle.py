@@ -0,0 +1,38 @@
+import asyncio
+import signal
+
+from app.core.config import settings
+from app.main import _drain_on_signal
+from app.services.llm_analyzer import llm_service
+
+def test_signal_starts_drain_before_server_shutdown(monkeypatch):
+    monkeypatch.setattr(settings, "SHUTDOWN_READINESS_DELAY", 0.2)
+    monkeypatch.setattr(llm_service, "_draining", False)
+    forwarded = []
+    original = {sig: signal.getsignal(sig) for sig in (signal.SIGINT, signal.SIGTERM)}
+    signal.signal(signal.SIGTERM, lambda signum, frame: forwarded.append(signum))
+
+    async def scenario():
+        _drain_on_signal()
+        signal.raise_signal(signal.SIGTERM)
+        await asyncio.sleep(0.05)
+        # 信号到达后立即排空，uvicorn 的处理函数在延迟结束后才被调用
+        assert llm_service.is_draining and forwarded == []
+        await asyncio.sleep(0.3)
+        assert forwarded == [signal.SIGTERM]
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        for sig, handler in original.items():
+            signal.signal(sig, handler)
+
+def test_requests_are_rejected_while_draining(client, auth_headers):
+    llm_service.begin_drain()
+    r = client.post("/api/v1/analyze", headers=auth_headers, json={
+        "code_content": "print(1)", "language": "Python", "dimensions": ["security"],
+    })
+    assert r.status_code == 503 and r.headers["Retry-After"] == "5"
+
+    r = client.get("/ready")
+    assert r.status_code == 503 and r.json()["checks"]["lifecycle"] == "draining"
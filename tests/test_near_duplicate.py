@@ -0,0 +1,102 @@
+import time
+
+import pytest
+
+from app.services.near_duplicate import fingerprint, normalize_tokens, remap_lines, similarity
+
+@pytest.mark.parametrize("code, language", [
+    ('x = """' + "\\" * 51, "Python"),        # 未闭合的三引号字符串 + 连续反斜杠
+    ("x = '''" + "\\" * 50_001, "Python"),
+    ("/*a" * 20_000, "Java"),                  # 大量未闭合的块注释起始符
+    ("`" + "\\" * 50_001, "JavaScript"),
+    ('"""' * 20_000 + "\\", "Auto"),
+    ('"""' * 20_001 + "\\", "Python"),      # 末尾落单的反斜杠
+    ('"' + '\\"' * 50_000, "Python"),        # 未闭合的单行字符串
+    ("'" + "\\'" * 50_000, "Java"),
+    ('"a\\' * 50_000, "Python"),
+])
+def test_tokenizer_is_linear_on_pathological_input(code, language):
+    start = time.perf_counter()
+    normalize_tokens(code, language)
+    assert time.perf_counter() - start < 1.0
+
+def test_unterminated_string_ends_at_line_end():
+    assert normalize_tokens('x = "abc\ny = 1', "Python") == [
+        ("V", 1), ("=", 1), ('"abc', 1), ("V", 2), ("=", 2), ("1", 2)
+    ]
+
+def test_unterminated_block_comment_is_dropped():
+    assert normalize_tokens("int a; /* unterminated\nint b;", "Java") == [("int", 1), ("V", 1), (";", 1)]
+
+def test_auto_language_keeps_floor_division_and_preprocessor_lines():
+    py = "def half(a, b):\n    return a // b + 1\n"
+    assert [t for t, _ in normalize_tokens(py, "Auto")][-6:] == ["V", "/", "/", "V", "+", "1"]
+    c = "#include <stdio.h>\nint main() { return 0; } // done\n"
+    tokens = [t for t, _ in normalize_tokens(c, "Auto")]
+    assert tokens[:3] == ["#", "V", "<"] and "done" not in tokens
+
+    a = "def scale(total, count):\n    avg = total // count\n    return avg\n"
+    b = "def scale(total, count):\n    avg = total // count * secret_key(total)\n    return avg\n"
+    assert similarity(fingerprint(a, "Auto"), fingerprint(b, "Auto")) < 0.7
+
+def test_comments_and_renames_do_not_change_fingerprint():
+    a = "def add(a, b):\n    total = a + b\n    return total\n"
+    b = "# helper\n\ndef add(x, y):\n    s = x + y  # sum\n    return s\n"
+    assert similarity(fingerprint(a, "Python"), fingerprint(b, "Python")) == 1.0
+
+def test_remap_lines_follows_shifted_code():
+    a = "def add(a, b):\n    total = a + b\n    if total > 10:\n        print('big')\n    return total\n"
+    b = "# header\n\n" + a
+    result = {"score": 80, "issues": [{"line": 4}, {"line": None}]}
+    remapped = remap_lines(result, fingerprint(a, "Python"), fingerprint(b, "Python"), b.count("\n") + 1)
+    assert [i["line"] for i in remapped["issues"]] == [6, None]
+
+def test_api_changes_are_not_treated_as_duplicates():
+    a = (
+        "def check(user_input, password):\n"
+        "    digest = hashlib.md5(password.encode()).hexdigest()\n"
+        "    result = eval(user_input)\n"
+        "    return result == digest\n"
+    )
+    b = a.replace("md5", "sha256").replace("eval(", "len(")
+    assert similarity(fingerprint(a, "Python"), fingerprint(b, "Python")) < 0.7
+
+def _fake_llm(monkeypatch, calls):
+    from app.core.models import AnalysisResponse, IssueDetail
+    from app.services.llm_analyzer import llm_service
+
+    async def analyze_code(req, user_id=None, reference=None):
+        calls.append(reference)
+        return AnalysisResponse(score=60, issues=[
+            IssueDetail(dimension="security", type="Error", description="uses md5", line=2, suggestion="use sha256")
+        ])
+    monkeypatch.setattr(llm_service, "analyze_code", analyze_code)
+
+CODE = "import hashlib\ndef h(p):\n    return hashlib.md5(p).hexdigest()\n"
+
+def _analyze(client, headers, code):
+    return client.post("/api/v1/analyze", headers=headers, json={
+        "code_content": code, "language": "Python", "dimensions": ["security"],
+    })
+
+def test_near_duplicate_seeds_by_default(client, auth_headers, monkeypatch):
+    calls = []
+    _fake_llm(monkeypatch, calls)
+    _analyze(client, auth_headers, CODE)
+    resp = _analyze(client, auth_headers, "# resubmitted\n" + CODE.replace("(p)", "(pwd)"))
+
+    assert len(calls) == 2
+    assert calls[1] is not None and calls[1].issues[0].line == 3  # 作为参考传入，行号已对齐
+    assert "x-near-duplicate-of" not in resp.headers
+
+def test_near_duplicate_reuse_when_enabled(client, auth_headers, monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "NEAR_DUP_REUSE_ENABLED", True)
+    calls = []
+    _fake_llm(monkeypatch, calls)
+    _analyze(client, auth_headers, CODE)
+    resp = _analyze(client, auth_headers, "# resubmitted\n" + CODE)
+
+    assert len(calls) == 1
+    assert resp.headers["x-near-duplicate-similarity"] == "1.000"
+    assert resp.json()["issues"][0]["line"] == 3
@@ -0,0 +1,78 @@
+import asyncio
+
+from app.services.scheduler import FairScheduler
+
+def test_released_slots_rotate_between_users():
+    scheduler = FairScheduler(limit=1)
+    order = []
+
+    async def call(user, gate):
+        async with scheduler.slot(user):
+            order.append(user)
+            await gate.wait()
+
+    async def scenario():
+        gate = asyncio.Event()
+        first = asyncio.create_task(call("a", gate))
+        await asyncio.sleep(0)
+        # 用户 a 先排入 3 个请求，b、c 各 1 个；名额应在用户之间轮转而不是先处理完 a
+        queued = [asyncio.create_task(call(user, gate)) for user in ("a", "a", "a", "b", "c")]
+        await asyncio.sleep(0)
+        assert scheduler.active == 1 and scheduler.waiting_by_user() == {"a": 3, "b": 1, "c": 1}
+        gate.set()
+        await asyncio.gather(first, *queued)
+
+    asyncio.run(scenario())
+    assert order == ["a", "a", "b", "c", "a", "a"]
+    assert scheduler.active == 0 and scheduler.waiting == 0
+
+def test_cancel_while_queued_frees_the_queue():
+    scheduler = FairScheduler(limit=1)
+    order = []
+
+    async def call(user, gate):
+        async with scheduler.slot(user):
+            order.append(user)
+            await gate.wait()
+
+    async def scenario():
+        gate = asyncio.Event()
+        first = asyncio.create_task(call("a", gate))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(call("b", gate))
+        waiting = asyncio.create_task(call("c", gate))
+        await asyncio.sleep(0)
+
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        assert scheduler.waiting_by_user() == {"c": 1}
+
+        gate.set()
+        await asyncio.gather(first, waiting)
+
+    asyncio.run(scenario())
+    assert order == ["a", "c"]
+    assert scheduler.active == 0 and scheduler.waiting == 0
+
+def test_cancel_after_slot_granted_returns_it():
+    scheduler = FairScheduler(limit=1)
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot("a"):
+                await gate.wait()
+
+        first = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        # 名额释放并分配给排队的请求后、请求恢复执行前被取消，名额应归还
+        gate.set()
+        await first
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        assert scheduler.active == 0
+
+    asyncio.run(scenario())
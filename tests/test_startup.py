@@ -0,0 +1,5 @@
+from app import startup_profile
+
+def test_cold_start_within_budget():
+    """导入 app.main 不超过冷启动预算，且不提前导入需延迟加载的重量级依赖"""
+    assert startup_profile.main([]) == 0
@@ -0,0 +1,102 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services.usage import QuotaExceeded, UsageTracker, usage_tracker
+
+def _usage(prompt_tokens, completion_tokens):
+    return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+@pytest.fixture()
+def tracker(monkeypatch):
+    """不访问数据库的 UsageTracker：写库结果保存在 db 中，_load_totals 从中汇总"""
+    tracker = UsageTracker()
+    tracker.db = {}
+
+    def write(batch):
+        for (uid, _), values in batch.items():
+            requests, tokens = tracker.db.get(uid, (0, 0))
+            tracker.db[uid] = (requests + int(values[0]), tokens + int(values[1] + values[2]))
+
+    def load_totals(user_ids, since):
+        time.sleep(0.02)
+        return {uid: tracker.db[uid] for uid in user_ids if uid in tracker.db}
+
+    monkeypatch.setattr(tracker, "_write", write)
+    monkeypatch.setattr(tracker, "_load_totals", load_totals)
+    return tracker
+
+def test_concurrent_reserve_stops_at_request_limit(tracker, monkeypatch):
+    monkeypatch.setattr(settings, "USAGE_DAILY_REQUEST_LIMIT", 3)
+
+    async def call():
+        async with tracker.reserve(1):
+            await asyncio.sleep(0.05)
+            tracker.record(1, "m", _usage(10, 5))
+
+    async def scenario():
+        return await asyncio.gather(*(call() for _ in range(10)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert results.count(None) == 3
+    assert all(isinstance(r, QuotaExceeded) for r in results if r is not None)
+    assert tracker._reserved == {}
+
+def test_failed_flush_merges_batch_back(tracker, monkeypatch):
+    tracker.record(1, "m", _usage(10, 5))
+
+    def failing_write(batch):
+        time.sleep(0.05)
+        raise RuntimeError("database is locked")
+    monkeypatch.setattr(tracker, "_write", failing_write)
+
+    async def scenario():
+        async def record_during_write():
+            await asyncio.sleep(0.01)
+            tracker.record(1, "m", _usage(20, 10))
+        await asyncio.gather(tracker.flush(), record_during_write())
+
+    asyncio.run(scenario())
+    assert tracker._pending == {(1, "m"): [2, 30, 15, 0.0]}
+    assert tracker._flushing == {}
+
+def test_baseline_loaded_during_refresh_is_kept_and_not_double_counted(tracker, monkeypatch):
+    monkeypatch.setattr(settings, "USAGE_DAILY_REQUEST_LIMIT", 2)
+    tracker.record(1, "m", _usage(10, 5))
+
+    load_totals = tracker._load_totals
+    def slow_refresh(user_ids, since):
+        if 2 in user_ids:
+            time.sleep(0.1)
+        return load_totals(user_ids, since)
+    monkeypatch.setattr(tracker, "_load_totals", slow_refresh)
+
+    async def scenario():
+        # 用户 2 已有基线，flush 写库后会刷新它；刷新期间用户 1 首次请求并加载基线
+        await tracker._ensure_baseline(2)
+
+        async def reserve_during_refresh():
+            await asyncio.sleep(0.01)
+            async with tracker.reserve(1):
+                pass
+        await asyncio.gather(tracker.flush(), reserve_during_refresh())
+
+    asyncio.run(scenario())
+    assert tracker.db == {1: (1, 15)}
+    assert set(tracker._baseline) == {1, 2}
+    assert tracker._baseline[1][1:3] == (1, 15)
+
+def test_usage_endpoint_includes_unsaved_usage(client, auth_headers):
+    user_id = client.get("/api/v1/auth/me", headers=auth_headers).json()["id"]
+    usage_tracker.record(user_id, "deepseek-v3.1", _usage(100, 20))
+    usage_tracker.record(user_id, "deepseek-v3.1", _usage(50, 10))
+
+    data = client.get("/api/v1/usage/", headers=auth_headers).json()
+    assert data["requests"] == 2 and data["today_requests"] == 2
+    assert data["today_tokens"] == 180
+    assert [(m["model"], m["prompt_tokens"], m["completion_tokens"]) for m in data["by_model"]] == [
+        ("deepseek-v3.1", 150, 30)
+    ]